@@ -6,25 +6,57 @@
 #       它完整地实现了与 MaixCam Pro 脚本 (v1.9.1) 配套的通信协议，
 #       并通过“读取即消费”机制修复了在发送端停止后，接收端会重复打印最后一条数据的问题。
 
+import asyncio
+import os
+import re
+import select
 import serial
 import struct
 import time
-from threading import Thread, Lock
+from collections import deque, namedtuple
+from threading import Thread
 
-class MaixCamReceiver:
+
+class Frame(namedtuple('Frame', ('x', 'y', 'w', 'h', 'timestamp'))):
     """
-    一个用于接收和解析来自 MaixCam Pro 串口数据的类。
+    一帧检测数据。
+    基于 namedtuple 实现，相比字典占用更少内存、创建更快，可通过 frame.x 等属性访问；
+    同时兼容旧版的 frame['x'] 字典式访问。
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            # 字段名预先映射为下标，与字典一样对未知键抛出 KeyError
+            key = _FRAME_FIELD_INDEX[key]
+        return tuple.__getitem__(self, key)
+
+
+# 字段名 -> 下标；键直接复用 namedtuple 中已驻留 (interned) 的字段名字符串
+_FRAME_FIELD_INDEX = {name: index for index, name in enumerate(Frame._fields)}
+
+
+class _MaixCamReceiverBase:
+    """
+    MaixCamReceiver 与 AsyncMaixCamReceiver 的公共部分：
+    通信协议定义、接收缓冲区、数据帧解析以及未读数据包的缓存与读取。
     """
     # --- 通信协议定义 ---
     _SOF = b'\xAA\x55'  # 帧起始符
     _EOF = b'\x55\xAA'  # 帧结束符
     _PAYLOAD_FORMAT = '<4HQ' # 4H for bbox, Q for timestamp
-    _PAYLOAD_SIZE = struct.calcsize(_PAYLOAD_FORMAT)
+    _PAYLOAD_STRUCT = struct.Struct(_PAYLOAD_FORMAT)  # 预编译格式，避免每帧重复解析格式字符串
+    _PAYLOAD_SIZE = _PAYLOAD_STRUCT.size
     _CHECKSUM_SIZE = 1
     _EXPECTED_PACKET_LEN = _PAYLOAD_SIZE + _CHECKSUM_SIZE
+    _FRAME_LEN = len(_SOF) + 1 + _EXPECTED_PACKET_LEN + len(_EOF) # 帧头 + 长度 + 载荷 + 校验和 + 帧尾
+    # 完整数据帧的匹配模式：帧头 + 固定长度的 (长度 + 载荷 + 校验和) + 帧尾
+    _FRAME_PATTERN = re.compile(re.escape(_SOF) + b'.{%d}' % (1 + _EXPECTED_PACKET_LEN) + re.escape(_EOF), re.DOTALL)
+    _make_frame = Frame._make # 直接由解包结果构造 Frame
+    _RX_BUFFER_SIZE = 4096 # 预分配的接收缓冲区大小 (字节)
     
-    # CRC8 查表法
-    _CRC8_TABLE = (
+    # CRC8 查表法 (多项式 0x07，初值 0)
+    _CRC8_TABLE = ( # tuple 比 bytes 查表更快
         0x00, 0x07, 0x0e, 0x09, 0x1c, 0x1b, 0x12, 0x15, 0x38, 0x3f, 0x36, 0x31, 0x24, 0x23, 0x2a, 0x2d,
         0x70, 0x77, 0x7e, 0x79, 0x6c, 0x6b, 0x62, 0x65, 0x48, 0x4f, 0x46, 0x41, 0x54, 0x53, 0x5a, 0x5d,
         0xe0, 0xe7, 0xee, 0xe9, 0xfc, 0xfb, 0xf2, 0xf5, 0xd8, 0xdf, 0xd6, 0xd1, 0xc4, 0xc3, 0xca, 0xcd,
@@ -43,33 +75,160 @@ class MaixCamReceiver:
         0xde, 0xd9, 0xd0, 0xd7, 0xc2, 0xc5, 0xcc, 0xcb, 0xe6, 0xe1, 0xe8, 0xef, 0xfa, 0xfd, 0xf4, 0xf3
     )
 
-    def __init__(self, port, baudrate, debug=False):
+    def __init__(self, port, baudrate, debug=False, buffer_size=1):
         """
         初始化接收器。
         :param port: 串口设备路径 (例如 '/dev/ttyAMA0')
         :param baudrate: 波特率 (例如 115200)
         :param debug: 是否打印调试信息
+        :param buffer_size: 最多缓存的未读数据包数量，缓存满时丢弃最旧的数据包
         """
+        if buffer_size < 1:
+            raise ValueError(f"buffer_size 必须为正整数，收到: {buffer_size}")
         self.port = port
         self.baudrate = baudrate
         self.debug = debug
         self.ser = None
         self.is_running = False
-        self.thread = None
-        self.lock = Lock()
-        self.latest_data = None
-        
-    def _calculate_crc8(self, data_bytes):
+        # 定长环形缓存：deque 的 append/popleft 在 GIL 下是原子操作，无需加锁；
+        # 缓存满时新数据会自动挤掉最旧的未读数据
+        self._frames = deque(maxlen=buffer_size)
+        # 预分配的定长接收缓冲区，数据直接读入其中，稳态下不产生新的 bytes 对象
+        self._rxbuf = bytearray(self._RX_BUFFER_SIZE)
+        self._rxview = memoryview(self._rxbuf)
+        self._rxlen = 0 # 缓冲区中有效数据的长度
+
+    @staticmethod
+    def _calculate_crc8(data_bytes, table=_CRC8_TABLE):
         """为给定的数据计算 CRC-8 校验和。"""
+        # table 通过默认参数绑定为局部变量，避免循环内重复的属性查找
         crc = 0
         for byte in data_bytes:
-            crc = self._CRC8_TABLE[crc ^ byte]
+            crc = table[crc ^ byte]
         return crc
 
+    def get_latest_data(self):
+        """
+        获取并消费最新接收到的数据。
+        调用此方法后，内部数据将被清除，直到接收到下一个数据包。
+        :return: 最新的 Frame，或 None (如果没有新数据)。
+        """
+        pending = self.get_all_pending()  # 读取后即消费数据，较旧的数据一并丢弃
+        return pending[-1] if pending else None
+
+    def get_all_pending(self):
+        """
+        获取并消费所有尚未读取的数据。
+        最多返回 buffer_size 个数据包，按接收顺序排列。
+        :return: Frame 列表，没有新数据时为空列表。
+        """
+        pending = []
+        popleft = self._frames.popleft
+        try:
+            while True:
+                pending.append(popleft())
+        except IndexError:
+            pass
+        return pending
+
+    def _process_buffer(self):
+        """
+        解析接收缓冲区中所有完整的数据帧。
+        由预编译的正则表达式 (C 实现) 查找完整数据帧并自动跳过无效字节，
+        处理完毕后只对缓冲区做一次截断，避免积压多帧时反复移动缓冲区内容。
+        """
+        buf = self._rxbuf
+        search = self._FRAME_PATTERN.search
+        frame_len = self._FRAME_LEN
+        end = self._rxlen
+        pos = 0
+
+        while True:
+            # 查找下一个以帧头开始、以帧尾结束的完整数据帧，其之前的无效字节将被丢弃
+            match = search(buf, pos, end)
+            if match is None:
+                # 保留末尾可能属于下一个 (尚未接收完整的) 数据帧的字节
+                pos = max(pos, end - (frame_len - 1))
+                break
+            pos = match.start()
+
+            packet_len = buf[pos + len(self._SOF)]
+            if packet_len != self._EXPECTED_PACKET_LEN:
+                if self.debug:
+                    print(f"[警告] 数据包长度不匹配。预期: {self._EXPECTED_PACKET_LEN}, 收到: {packet_len}。")
+                pos += 1 # 跳过该帧头，重新同步
+                continue
+
+            # 定位数据帧各部分：载荷、校验和
+            payload_offset = pos + len(self._SOF) + 1
+            checksum_offset = payload_offset + self._PAYLOAD_SIZE
+
+            # 一个数据帧处理完毕
+            pos += frame_len
+
+            # 校验和验证
+            payload_bytes = buf[payload_offset:checksum_offset]
+            received_checksum = buf[checksum_offset]
+            calculated_checksum = self._calculate_crc8(payload_bytes)
+
+            if received_checksum == calculated_checksum:
+                # 校验成功，解析并存储数据
+                self._frames.append(self._make_frame(self._PAYLOAD_STRUCT.unpack_from(buf, payload_offset)))
+            else:
+                if self.debug:
+                    print(f"[错误] CRC8校验失败! 收到: {received_checksum:#04x}, 计算出: {calculated_checksum:#04x}")
+
+        # 移除已处理的字节：将剩余的未完整数据移到缓冲区开头
+        remaining = end - pos
+        if pos and remaining:
+            self._rxview[:remaining] = self._rxview[pos:end]
+        self._rxlen = remaining
+
+    def _read_available(self, fd):
+        """
+        在串口可读时调用：读取一批数据并解析其中所有完整的数据帧。
+        设备断开时抛出 serial.SerialException 或 OSError。
+        """
+        # 直接对文件描述符做一次批量读取，写入接收缓冲区的空闲部分：调用方已确认可读，
+        # 无需再经由 pyserial 的 in_waiting (ioctl) 和 read (内部再次 select)
+        try:
+            n = os.readv(fd, [self._rxview[self._rxlen:]])
+        except BlockingIOError:
+            return
+        if not n:
+            # 可读却读不到数据，说明设备已断开
+            raise serial.SerialException("设备报告可读但未返回数据 (设备已断开?)")
+        self._rxlen += n
+
+        # 一次性处理缓冲区中积压的所有完整数据帧
+        self._process_buffer()
+
+
+class MaixCamReceiver(_MaixCamReceiverBase):
+    """
+    一个用于接收和解析来自 MaixCam Pro 串口数据的类。
+    """
+    _POLL_TIMEOUT = 0.05 # 等待串口可读的超时时间 (秒)，决定 stop() 的最长响应时间
+    _RT_PRIORITY = 10 # realtime 模式下接收线程的 SCHED_FIFO 优先级
+
+    def __init__(self, port, baudrate, debug=False, buffer_size=1, realtime=False):
+        """
+        初始化接收器。
+        :param port: 串口设备路径 (例如 '/dev/ttyAMA0')
+        :param baudrate: 波特率 (例如 115200)
+        :param debug: 是否打印调试信息
+        :param buffer_size: 最多缓存的未读数据包数量，缓存满时丢弃最旧的数据包
+        :param realtime: 是否尝试将接收线程设为实时调度 (SCHED_FIFO) 并绑定到单个 CPU 核心，
+                         以减少调度抖动导致的丢字节 (仅 Linux，需要 root 或 CAP_SYS_NICE 权限)
+        """
+        super().__init__(port, baudrate, debug=debug, buffer_size=buffer_size)
+        self.realtime = realtime
+        self.thread = None
+
     def start(self):
         """打开串口并启动后台接收线程。"""
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=0) # 非阻塞读取，由 select 等待数据
             self.is_running = True
             self.thread = Thread(target=self._read_loop, daemon=True)
             self.thread.start()
@@ -90,101 +249,120 @@ class MaixCamReceiver:
             if self.debug:
                 print("[信息] 接收线程已停止，串口已关闭。")
 
-    def get_latest_data(self):
+    def _apply_realtime_tuning(self):
         """
-        获取并消费最新接收到的数据。
-        调用此方法后，内部数据将被清除，直到接收到下一个数据包。
-        :return: 最新的数据字典，或 None (如果没有新数据)。
+        尽力将当前 (接收) 线程设为 SCHED_FIFO 实时调度，并绑定到最后一个可用 CPU 核心。
+        两步相互独立，任何一步失败都只打印警告，不影响数据接收。
         """
-        with self.lock:
-            data_to_return = self.latest_data
-            self.latest_data = None  # 读取后即消费数据
-            return data_to_return
+        if not hasattr(os, 'sched_setscheduler'):
+            if self.debug:
+                print("[警告] 当前平台不支持实时调度，已忽略 realtime 参数。")
+            return
+        # pid 为 0 时作用于调用线程本身
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self._RT_PRIORITY))
+            if self.debug:
+                print(f"[信息] 接收线程已启用实时调度 (优先级 {self._RT_PRIORITY})。")
+        except OSError as e:
+            if self.debug:
+                print(f"[警告] 无法启用实时调度: {e}")
+        try:
+            cpu = max(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cpu})
+            if self.debug:
+                print(f"[信息] 接收线程已绑定到 CPU {cpu}。")
+        except OSError as e:
+            if self.debug:
+                print(f"[警告] 无法绑定 CPU 核心: {e}")
 
     def _read_loop(self):
         """在后台线程中运行的循环，用于持续接收和解析数据。"""
-        sync_state = 0
-        
+        if self.realtime:
+            self._apply_realtime_tuning()
+
+        fd = self.ser.fileno()
         while self.is_running:
             try:
-                # 1. 寻找帧头 (SOF)
-                if sync_state == 0:
-                    byte = self.ser.read(1)
-                    if byte == self._SOF[:1]: # 读到 0xAA
-                        sync_state = 1
-                elif sync_state == 1:
-                    byte = self.ser.read(1)
-                    if byte == self._SOF[1:]: # 读到 0x55
-                        sync_state = 2
-                    else:
-                        sync_state = 0 # 不是完整的帧头，重置状态
-                
-                # 2. 如果找到帧头，开始接收数据包
-                if sync_state == 2:
-                    # 读取数据包长度 (1字节)
-                    len_byte = self.ser.read(1)
-                    if not len_byte:
-                        sync_state = 0
-                        continue
-                    
-                    packet_len = len_byte[0]
-                    if packet_len != self._EXPECTED_PACKET_LEN:
-                        if self.debug:
-                            print(f"[警告] 数据包长度不匹配。预期: {self._EXPECTED_PACKET_LEN}, 收到: {packet_len}。")
-                        sync_state = 0
-                        continue
-
-                    # 读取载荷、校验和、帧尾
-                    full_packet_data = self.ser.read(packet_len + len(self._EOF))
-                    
-                    # 校验数据完整性
-                    if len(full_packet_data) != (packet_len + len(self._EOF)):
-                        if self.debug:
-                            print("[警告] 读取数据包超时，数据不完整。")
-                        sync_state = 0
-                        continue
-                    
-                    # 提取各部分
-                    packet_data = full_packet_data[:packet_len]
-                    eof_data = full_packet_data[packet_len:]
-
-                    # 校验帧尾
-                    if eof_data != self._EOF:
-                        if self.debug:
-                            print("[警告] 帧尾不匹配。")
-                        sync_state = 0
-                        continue
-                    
-                    # 3. 校验和验证
-                    payload_bytes = packet_data[:-self._CHECKSUM_SIZE]
-                    received_checksum = packet_data[-self._CHECKSUM_SIZE]
-                    calculated_checksum = self._calculate_crc8(payload_bytes)
-                    
-                    if received_checksum == calculated_checksum:
-                        # 校验成功，解析并存储数据
-                        unpacked_data = struct.unpack(self._PAYLOAD_FORMAT, payload_bytes)
-                        with self.lock:
-                            self.latest_data = {
-                                'x': unpacked_data[0],
-                                'y': unpacked_data[1],
-                                'w': unpacked_data[2],
-                                'h': unpacked_data[3],
-                                'timestamp': unpacked_data[4]
-                            }
-                    else:
-                        if self.debug:
-                            print(f"[错误] CRC8校验失败! 收到: {hex(received_checksum)}, 计算出: {hex(calculated_checksum)}")
-
-                    # 一个数据包处理完毕，重置状态
-                    sync_state = 0
-            
-            except serial.SerialException:
+                # 等待串口可读；超时后回到循环顶部检查 is_running，使 stop() 能及时返回
+                readable, _, _ = select.select([fd], [], [], self._POLL_TIMEOUT)
+                if readable:
+                    self._read_available(fd)
+
+            except (serial.SerialException, OSError): # os.readv 在设备断开时直接抛出 OSError
                 print("[错误] 串口断开连接。正在尝试关闭...")
                 self.is_running = False
             except Exception as e:
                 print(f"[错误] 接收线程发生未知错误: {e}")
 
 
+class AsyncMaixCamReceiver(_MaixCamReceiverBase):
+    """
+    MaixCamReceiver 的 asyncio 版本。
+    不创建后台线程，而是由事件循环监听串口可读事件，在调用方所在的线程中直接接收和解析数据，
+    省去线程间的切换与同步。get_latest_data() 与 get_all_pending() 的用法与同步版本相同。
+    """
+
+    def __init__(self, port, baudrate, debug=False, buffer_size=1):
+        """参数含义与 MaixCamReceiver 相同 (不支持 realtime)。"""
+        super().__init__(port, baudrate, debug=debug, buffer_size=buffer_size)
+        self._loop = None
+        self._new_data = None
+
+    async def start(self):
+        """打开串口并在当前事件循环中注册可读回调。"""
+        try:
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=0)
+        except serial.SerialException as e:
+            print(f"[致命错误] 无法打开串口 {self.port}: {e}")
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._new_data = asyncio.Event()
+        self.is_running = True
+        self._loop.add_reader(self.ser.fileno(), self._on_readable)
+        if self.debug:
+            print(f"[信息] 成功打开串口 {self.port}，已在事件循环中开始接收。")
+        return True
+
+    def stop(self):
+        """注销可读回调并关闭串口。"""
+        if self.is_running:
+            self.is_running = False
+            self._loop.remove_reader(self.ser.fileno())
+            self._new_data.set() # 唤醒正在等待的 get_frame()
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+            if self.debug:
+                print("[信息] 已停止接收，串口已关闭。")
+
+    async def get_frame(self):
+        """
+        等待并消费下一个数据包，按接收顺序逐个返回。
+        :return: 最早的未读 Frame；接收器已停止且没有未读数据时返回 None。
+        """
+        while True:
+            try:
+                return self._frames.popleft()
+            except IndexError:
+                pass
+            if not self.is_running:
+                return None
+            self._new_data.clear()
+            await self._new_data.wait()
+
+    def _on_readable(self):
+        """事件循环在串口可读时调用的回调。"""
+        try:
+            self._read_available(self.ser.fileno())
+        except (serial.SerialException, OSError):
+            print("[错误] 串口断开连接。正在尝试关闭...")
+            self.stop()
+            return
+        except Exception as e:
+            print(f"[错误] 接收数据时发生未知错误: {e}")
+        if self._frames:
+            self._new_data.set()
+
+
 # =============================================================================
 # --- 示例用法 ---
 # =============================================================================
@@ -207,7 +385,7 @@ if __name__ == "__main__":
             while True:
                 data = receiver.get_latest_data()
                 if data:
-                    print(f"最新数据: X={data['x']}, Y={data['y']}, W={data['w']}, H={data['h']}, Time={data['timestamp']}")
+                    print(f"最新数据: X={data.x}, Y={data.y}, W={data.w}, H={data.h}, Time={data.timestamp}")
                 
                 # 主程序可以做其他事情，这里只做简单延时
                 time.sleep(0.1)